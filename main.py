@@ -1,10 +1,14 @@
 # main.py
 import asyncio
 import base64
-import json
 import logging
+import socket
+import struct
+import time
 from typing import Set
 
+import orjson
+import xxhash
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
@@ -15,6 +19,25 @@ from playwright.async_api import async_playwright, Playwright, Page, Browser
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("remote-browser-proto")
 
+# Optional: libjpeg-turbo bindings for SIMD JPEG re-encoding. When
+# available, the screencast captures at max quality and frames are
+# re-encoded locally when the adaptive controller lowers quality,
+# avoiding screencast restarts. Falls back cleanly when missing.
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420
+    TURBO_JPEG = TurboJPEG()
+except Exception:
+    TURBO_JPEG = None
+
+# Optional: OpenCV for transcoding frames to WebP, which is ~25-35%
+# smaller than JPEG at similar quality and decodes natively in every
+# evergreen browser. Without it, frames stay JPEG.
+try:
+    import cv2
+    import numpy as np
+except Exception:
+    cv2 = None
+
 app = FastAPI()
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -33,16 +56,140 @@ HEADLESS_BROWSER: Browser = None
 HEADLESS_CONTEXT = None
 HEADLESS_PAGE: Page = None
 
+# Cached headless viewport; reading Page.viewport_size per frame/event
+# crosses the Playwright RPC boundary for a value that only changes on
+# explicit resize. Updated via set_viewport.
+VIEWPORT = {"width": 1280, "height": 720}
+
+def set_viewport(width: int, height: int):
+    """Record a new headless viewport size and refresh the cached meta."""
+    VIEWPORT["width"] = width
+    VIEWPORT["height"] = height
+    _refresh_meta()
+
 PAGE_LOCK = asyncio.Lock()
 CLIENTS: Set[WebSocket] = set()
+# Copy-on-write view of CLIENTS, rebuilt on connect/disconnect so the
+# broadcast hot path iterates a stable tuple without copying the set.
+CLIENTS_SNAPSHOT: tuple = ()
+
+def _rebuild_client_snapshot():
+    global CLIENTS_SNAPSHOT
+    CLIENTS_SNAPSHOT = tuple(CLIENTS)
+
+# Set while at least one client is connected; the screencast only runs
+# while this is set, so an idle server does no capture work at all.
+CLIENTS_PRESENT = asyncio.Event()
+
+# A client that cannot take a frame within this window is considered a
+# slow consumer and is disconnected rather than stalling the broadcast.
+SEND_TIMEOUT = 0.2
+
+# Per-client event queue bound; a flood of events drops the oldest
+# rather than spawning an unbounded pile of tasks behind PAGE_LOCK.
+EVENT_QUEUE_MAX = 32
+# How many queued events one scheduling turn of the worker may drain.
+EVENT_BATCH_MAX = 16
 
 CAPTURE_FPS = 5
-_capture_task = None
+CDP_SESSION = None
+
+# Capture/broadcast pipeline: the screencast handler acks Chromium as
+# soon as a frame is queued, so the next frame is captured while the
+# previous one is still being transcoded and sent. maxsize=2 keeps at
+# most one frame in flight plus one waiting; older frames are dropped.
+FRAME_QUEUE: asyncio.Queue = None
+_broadcaster_task = None
+
+# Adaptive quality controller: when a broadcast takes longer than the
+# frame budget, drop JPEG quality (and skip a frame) to keep latency
+# bounded; when broadcasts are consistently fast, creep quality back up.
+QUALITY_MIN = 30
+QUALITY_MAX = 75
+CAPTURE_STATE = {
+    "quality": 60,
+    "budget": 1.0 / CAPTURE_FPS,
+    "fast_ticks": 0,
+    "skip_next": False,
+}
+
+# Frame dedup: skip broadcasting byte-identical frames (xxh3 is fast
+# enough to be negligible next to the JPEG work), but still send a
+# keepalive frame every couple of seconds.
+DEDUP_STATE = {"last_hash": None, "last_send": 0.0}
+KEEPALIVE_INTERVAL = 2.0
+
+# Below this size the thread-pool handoff costs more than the work;
+# only offload the base64 decode for payloads worth it.
+TO_THREAD_MIN_BYTES = 32 * 1024
+
+# Last payload that went out; sent to new clients right after meta so
+# they get a picture immediately instead of waiting for the next frame.
+LAST_FRAME = {"payload": None}
+
+# Serialized meta message, identical for every client until the page
+# navigates or the viewport changes; refreshed rather than re-built
+# per connection.
+META_CACHE = {"text": None}
+
+def _refresh_meta():
+    """Re-serialize the cached meta message after navigation or resize."""
+    if HEADLESS_PAGE:
+        meta = {"type": "meta", "viewport": dict(VIEWPORT), "url": HEADLESS_PAGE.url}
+    else:
+        meta = {"type": "meta", "viewport": dict(VIEWPORT), "url": ""}
+    META_CACHE["text"] = orjson.dumps(meta).decode()
+
+def _set_tcp_nodelay(ws: WebSocket):
+    """Disable Nagle on the client socket so small frames flush immediately.
+
+    Best-effort: the transport is not exposed on every server/protocol
+    combination, in which case this is a no-op.
+    """
+    try:
+        transport = ws.scope.get("transport")
+        sock = transport.get_extra_info("socket") if transport else None
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except Exception:
+        logger.debug("Could not set TCP_NODELAY on client socket.", exc_info=True)
+
+# Binary frame protocol: a small fixed header followed by the raw image bytes.
+# Header layout (network byte order): frame type, width, height.
+FRAME_HEADER_FMT = "!BHH"
+FRAME_TYPE_JPEG = 1
+FRAME_TYPE_WEBP = 2
+# Preferred wire format; WebP requires OpenCV and falls back to JPEG.
+FRAME_FORMAT = "webp"
+# Reused across frames to avoid a fresh allocation per tick; all frame
+# payloads are built on the event loop, so reuse is safe.
+HEADER_BUF = bytearray(struct.calcsize(FRAME_HEADER_FMT))
+
+def _frame_payload(img_bytes: bytes, width: int, height: int, frame_type: int = FRAME_TYPE_JPEG) -> bytes:
+    """Prepend the binary frame header to the image bytes."""
+    struct.pack_into(FRAME_HEADER_FMT, HEADER_BUF, 0, frame_type, width, height)
+    return bytes(HEADER_BUF) + img_bytes
+
+def _webp_enabled() -> bool:
+    return FRAME_FORMAT == "webp" and cv2 is not None
+
+def _local_reencode() -> bool:
+    """True when frames are transcoded server-side after capture."""
+    return _webp_enabled() or TURBO_JPEG is not None
+
+def _transcode_webp(jpeg_bytes: bytes, quality: int) -> bytes:
+    """Transcode a CDP JPEG frame to WebP at the current quality target."""
+    arr = cv2.imdecode(np.frombuffer(jpeg_bytes, np.uint8), cv2.IMREAD_COLOR)
+    ok, out = cv2.imencode(".webp", arr, [cv2.IMWRITE_WEBP_QUALITY, quality])
+    if not ok:
+        raise ValueError("WebP encode failed")
+    return out.tobytes()
 
 @app.on_event("startup")
 async def on_startup():
     global PLAYWRIGHT, VISIBLE_BROWSER, VISIBLE_CONTEXT, VISIBLE_PAGE
-    global HEADLESS_BROWSER, HEADLESS_CONTEXT, HEADLESS_PAGE, _capture_task
+    global HEADLESS_BROWSER, HEADLESS_CONTEXT, HEADLESS_PAGE
+    global FRAME_QUEUE, _broadcaster_task
 
     try:
         PLAYWRIGHT = await async_playwright().start()
@@ -68,26 +215,38 @@ async def on_startup():
         HEADLESS_CONTEXT = await HEADLESS_BROWSER.new_context(viewport={"width": 1280, "height": 720})
         HEADLESS_PAGE = await HEADLESS_CONTEXT.new_page()
         await HEADLESS_PAGE.goto("https://example.com")
+        vs = HEADLESS_PAGE.viewport_size
+        if vs:
+            set_viewport(vs["width"], vs["height"])
         logger.info("Headless browser launched and navigated to example.com.")
     except Exception:
         logger.exception("Failed to start headless browser. Streaming disabled.")
         HEADLESS_PAGE = None
 
-    # Start capture loop only if headless page is available
+    _refresh_meta()
+
+    # Start the CDP screencast only if headless page is available
     if HEADLESS_PAGE:
-        _capture_task = asyncio.create_task(capture_loop())
-        logger.info("Capture loop started.")
+        try:
+            await start_screencast()
+            FRAME_QUEUE = asyncio.Queue(maxsize=2)
+            _broadcaster_task = asyncio.create_task(frame_broadcaster())
+            logger.info("Screencast session ready (starts on first client).")
+        except Exception:
+            logger.exception("Failed to start screencast. Streaming disabled.")
     else:
-        logger.warning("Headless page not available; capture loop not started.")
+        logger.warning("Headless page not available; screencast not started.")
 
     logger.info("Server startup complete.")
 
 @app.on_event("shutdown")
 async def on_shutdown():
-    global PLAYWRIGHT, VISIBLE_BROWSER, HEADLESS_BROWSER, _capture_task
+    global PLAYWRIGHT, VISIBLE_BROWSER, HEADLESS_BROWSER
     try:
-        if _capture_task:
-            _capture_task.cancel()
+        if _broadcaster_task:
+            _broadcaster_task.cancel()
+        if CDP_SESSION:
+            await CDP_SESSION.send("Page.stopScreencast")
     except Exception:
         pass
 
@@ -101,79 +260,287 @@ async def on_shutdown():
     except Exception as e:
         logger.exception("Error during shutdown: %s", e)
 
-async def capture_loop():
-    global HEADLESS_PAGE
-    logger.info("capture_loop running (fps=%s)", CAPTURE_FPS)
-    sleep_time = 1.0 / max(1, CAPTURE_FPS)
-    while True:
-        if not CLIENTS:
-            await asyncio.sleep(0.5)
-            continue
-        if not HEADLESS_PAGE:
-            logger.warning("HEADLESS_PAGE not available in capture_loop; sleeping.")
-            await asyncio.sleep(1.0)
-            continue
-        try:
-            img_bytes = await HEADLESS_PAGE.screenshot(type="jpeg", quality=60)
-            b64 = base64.b64encode(img_bytes).decode("ascii")
-            vs = HEADLESS_PAGE.viewport_size or {"width": 1280, "height": 720}
-
-            payload = json.dumps({
-                "type": "frame",
-                "image": b64,
-                "width": vs["width"],
-                "height": vs["height"],
-            })
-
-            stale = []
-            for ws in list(CLIENTS):
+async def broadcast(payload: bytes):
+    """Fan a pre-serialized payload out to all clients concurrently.
+
+    Sends run in parallel via asyncio.gather so total broadcast time is
+    bounded by the slowest client rather than the sum of all of them —
+    and each send is capped at SEND_TIMEOUT so one hung client cannot
+    hold the broadcast until TCP gives up. Clients that time out or
+    error are dropped.
+    """
+    clients = CLIENTS_SNAPSHOT
+    if not clients:
+        return
+    results = await asyncio.gather(
+        *(asyncio.wait_for(ws.send_bytes(payload), timeout=SEND_TIMEOUT) for ws in clients),
+        return_exceptions=True,
+    )
+    for ws, result in zip(clients, results):
+        if isinstance(result, asyncio.TimeoutError):
+            asyncio.create_task(_drop_slow_client(ws))
+        elif isinstance(result, Exception):
+            _client_gone(ws)
+
+async def _drop_slow_client(ws: WebSocket):
+    try:
+        await ws.close(code=1013)  # "try again later"
+    except Exception:
+        pass
+    _client_gone(ws)
+    logger.info("Dropped slow client. Total: %s", len(CLIENTS))
+
+async def start_screencast():
+    """Create the CDP session for Page.screencastFrame on the headless page.
+
+    Chromium pushes a JPEG only when the compositor produces new content,
+    so there is no fixed-rate screenshot polling. The screencast itself
+    runs only while clients are connected: started on first connect,
+    stopped on last disconnect.
+    """
+    global CDP_SESSION
+    CDP_SESSION = await HEADLESS_CONTEXT.new_cdp_session(HEADLESS_PAGE)
+    CDP_SESSION.on("Page.screencastFrame", _on_screencast_frame)
+
+def _screencast_params() -> dict:
+    return {
+        "format": "jpeg",
+        # With a local transcoder (WebP or TurboJPEG) we capture once at
+        # max quality; without one, Chromium encodes at the target quality.
+        "quality": QUALITY_MAX if _local_reencode() else CAPTURE_STATE["quality"],
+        "maxWidth": 1280,
+        "maxHeight": 720,
+        "everyNthFrame": 1,
+    }
+
+async def _resume_screencast():
+    if not CDP_SESSION:
+        return
+    try:
+        await CDP_SESSION.send("Page.startScreencast", _screencast_params())
+        # Force the next frame out even if it matches the last one sent.
+        DEDUP_STATE["last_hash"] = None
+        logger.info("Client present; screencast resumed.")
+    except Exception:
+        logger.exception("Failed to resume screencast.")
+
+async def _pause_screencast():
+    if not CDP_SESSION:
+        return
+    try:
+        await CDP_SESSION.send("Page.stopScreencast")
+        logger.info("No clients; screencast paused.")
+    except Exception:
+        logger.exception("Failed to pause screencast.")
+
+def _client_gone(ws: WebSocket):
+    """Drop a client and pause the screencast when it was the last one."""
+    CLIENTS.discard(ws)
+    _rebuild_client_snapshot()
+    if not CLIENTS and CLIENTS_PRESENT.is_set():
+        CLIENTS_PRESENT.clear()
+        asyncio.create_task(_pause_screencast())
+
+def _reencode_jpeg(img_bytes: bytes, quality: int) -> bytes:
+    """Re-encode a JPEG at a lower quality with libjpeg-turbo (SIMD)."""
+    arr = TURBO_JPEG.decode(img_bytes)
+    return TURBO_JPEG.encode(arr, quality=quality, jpeg_subsample=TJSAMP_420)
+
+async def _set_screencast_quality(quality: int):
+    """Apply a new JPEG quality target from the adaptive controller."""
+    CAPTURE_STATE["quality"] = quality
+    if _local_reencode():
+        # Frames are re-encoded locally; no screencast restart needed.
+        logger.info("Frame quality adjusted to %s (local transcode)", quality)
+        return
+    await CDP_SESSION.send("Page.stopScreencast")
+    await CDP_SESSION.send("Page.startScreencast", _screencast_params())
+    logger.info("Screencast quality adjusted to %s", quality)
+
+async def _adapt_quality(elapsed: float):
+    """Tune quality based on how the last broadcast compared to the frame budget."""
+    budget = CAPTURE_STATE["budget"]
+    quality = CAPTURE_STATE["quality"]
+    if elapsed > 1.5 * budget:
+        CAPTURE_STATE["fast_ticks"] = 0
+        CAPTURE_STATE["skip_next"] = True
+        if quality > QUALITY_MIN:
+            await _set_screencast_quality(max(QUALITY_MIN, quality - 10))
+    elif elapsed < 0.5 * budget:
+        CAPTURE_STATE["fast_ticks"] += 1
+        if CAPTURE_STATE["fast_ticks"] >= 10 and quality < QUALITY_MAX:
+            CAPTURE_STATE["fast_ticks"] = 0
+            await _set_screencast_quality(min(QUALITY_MAX, quality + 5))
+    else:
+        CAPTURE_STATE["fast_ticks"] = 0
+
+async def _on_screencast_frame(params: dict):
+    """Queue one pushed screencast frame and ack it to Chromium right away."""
+    try:
+        if FRAME_QUEUE is not None:
+            if FRAME_QUEUE.full():
+                # Drop the stale frame; only the newest one matters.
                 try:
-                    await ws.send_text(payload)
-                except Exception:
-                    stale.append(ws)
-            for ws in stale:
-                CLIENTS.discard(ws)
+                    FRAME_QUEUE.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            FRAME_QUEUE.put_nowait(params["data"])
+    except Exception:
+        logger.exception("Error queueing screencast frame")
+    finally:
+        # Chromium will not push the next frame until this one is acked;
+        # acking before the broadcast keeps capture and network overlapped.
+        try:
+            await CDP_SESSION.send("Page.screencastFrameAck", {"sessionId": params["sessionId"]})
         except Exception:
-            logger.exception("Error during capture loop")
+            logger.exception("Failed to ack screencast frame")
 
-        await asyncio.sleep(sleep_time)
+async def frame_broadcaster():
+    """Consume captured frames from FRAME_QUEUE and broadcast them."""
+    while True:
+        data = await FRAME_QUEUE.get()
+        try:
+            if CAPTURE_STATE["skip_next"]:
+                CAPTURE_STATE["skip_next"] = False
+                continue
+            if len(data) >= TO_THREAD_MIN_BYTES:
+                img_bytes = await asyncio.to_thread(base64.b64decode, data)
+            else:
+                img_bytes = base64.b64decode(data)
+            frame_hash = xxhash.xxh3_64_intdigest(img_bytes)
+            now = time.monotonic()
+            if frame_hash == DEDUP_STATE["last_hash"] and now - DEDUP_STATE["last_send"] < KEEPALIVE_INTERVAL:
+                continue
+            DEDUP_STATE["last_hash"] = frame_hash
+            DEDUP_STATE["last_send"] = now
+            # Transcodes are a full decode+encode; always worth a thread.
+            frame_type = FRAME_TYPE_JPEG
+            if _webp_enabled():
+                img_bytes = await asyncio.to_thread(_transcode_webp, img_bytes, CAPTURE_STATE["quality"])
+                frame_type = FRAME_TYPE_WEBP
+            elif TURBO_JPEG and CAPTURE_STATE["quality"] < QUALITY_MAX:
+                img_bytes = await asyncio.to_thread(_reencode_jpeg, img_bytes, CAPTURE_STATE["quality"])
+            payload = _frame_payload(img_bytes, VIEWPORT["width"], VIEWPORT["height"], frame_type)
+            LAST_FRAME["payload"] = payload
+            started = time.perf_counter()
+            await broadcast(payload)
+            await _adapt_quality(time.perf_counter() - started)
+        except Exception:
+            logger.exception("Error broadcasting frame")
 
 @app.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
     await ws.accept()
+    _set_tcp_nodelay(ws)
     CLIENTS.add(ws)
+    _rebuild_client_snapshot()
     logger.info("Client connected. Total: %s", len(CLIENTS))
+    if not CLIENTS_PRESENT.is_set():
+        CLIENTS_PRESENT.set()
+        await _resume_screencast()
 
-    # send meta if page available
+    # send cached meta (re-serialized only on navigation/resize)
     try:
-        if HEADLESS_PAGE:
-            vs = HEADLESS_PAGE.viewport_size or {"width": 1280, "height": 720}
-            await ws.send_text(json.dumps({
-                "type": "meta",
-                "viewport": vs,
-                "url": HEADLESS_PAGE.url
-            }))
-        else:
-            await ws.send_text(json.dumps({"type": "meta", "viewport": {"width": 1280, "height": 720}, "url": ""}))
+        if META_CACHE["text"] is None:
+            _refresh_meta()
+        await ws.send_text(META_CACHE["text"])
+        # Follow meta with the most recent frame in the same write burst
+        # so the client renders immediately.
+        if LAST_FRAME["payload"] is not None:
+            await ws.send_bytes(LAST_FRAME["payload"])
     except Exception:
         logger.exception("Error sending meta to client.")
 
+    # Events are queued per client and applied serially by one worker
+    # task, bounding memory and lock contention from event floods.
+    event_queue: asyncio.Queue = asyncio.Queue(maxsize=EVENT_QUEUE_MAX)
+    worker = asyncio.create_task(event_worker(event_queue))
+
     try:
         while True:
             msg = await ws.receive_text()
             try:
-                data = json.loads(msg)
+                data = orjson.loads(msg)
                 if data.get("type") == "event":
-                    # schedule event application
-                    asyncio.create_task(handle_event(data))
+                    _enqueue_event(event_queue, data)
             except Exception as e:
                 logger.warning("Bad message from client: %s", e)
     except WebSocketDisconnect:
-        CLIENTS.discard(ws)
+        _client_gone(ws)
         logger.info("Client disconnected.")
     except Exception:
-        CLIENTS.discard(ws)
+        _client_gone(ws)
         logger.exception("Websocket handler exception; connection closed.")
+    finally:
+        worker.cancel()
+
+def _enqueue_event(queue: asyncio.Queue, data: dict):
+    """Queue an event, dropping the oldest entry when the queue is full."""
+    try:
+        queue.put_nowait(data)
+    except asyncio.QueueFull:
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        try:
+            queue.put_nowait(data)
+        except asyncio.QueueFull:
+            pass
+
+def _coalesce_events(batch: list) -> list:
+    """Collapse a drained batch into the fewest events worth applying.
+
+    Consecutive wheel deltas are summed, runs of single-character keys
+    become one "text" event typed in a single Playwright call, and
+    back-to-back navigates collapse to the last URL.
+    """
+    out = []
+    for ev in batch:
+        name = ev.get("name")
+        prev = out[-1] if out else None
+        if name == "wheel" and prev is not None and prev.get("name") == "wheel":
+            prev["deltaY"] = float(prev.get("deltaY", 0)) + float(ev.get("deltaY", 0))
+            prev["clientHeight"] = ev.get("clientHeight", prev.get("clientHeight"))
+        elif name == "key" and len(ev.get("key") or "") == 1:
+            if prev is not None and prev.get("name") == "text":
+                prev["text"] += ev["key"]
+            else:
+                out.append({"name": "text", "text": ev["key"]})
+        elif name == "navigate" and prev is not None and prev.get("name") == "navigate":
+            out[-1] = dict(ev)
+        else:
+            out.append(dict(ev))
+    return out
+
+async def event_worker(queue: asyncio.Queue):
+    """Apply one client's events serially, draining bursts in batches."""
+    while True:
+        batch = [await queue.get()]
+        while len(batch) < EVENT_BATCH_MAX:
+            try:
+                batch.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        for ev in _coalesce_events(batch):
+            await handle_event(ev)
+
+def _click_coords(msg: dict, width: int, height: int) -> tuple:
+    """Map normalized client ratios to remote-page pixel coordinates."""
+    x = int(float(msg.get("x_ratio", 0)) * width)
+    y = int(float(msg.get("y_ratio", 0)) * height)
+    return x, y
+
+def _wheel_pixels(msg: dict, height: int) -> float:
+    """Scale a client wheel delta to remote-page pixels."""
+    delta_y = float(msg.get("deltaY", 0))
+    client_h = float(msg.get("clientHeight") or height)
+    return delta_y * (height / client_h) if client_h else delta_y
+
+def _normalize_url(url: str) -> str:
+    if not (url.startswith("http://") or url.startswith("https://")):
+        url = "http://" + url
+    return url
 
 async def handle_event(msg: dict):
     """Apply an event to both pages (headless + visible)."""
@@ -185,15 +552,22 @@ async def handle_event(msg: dict):
                 logger.warning("No headless page to handle event: %s", name)
                 return
 
-            vs = HEADLESS_PAGE.viewport_size or {"width": 1280, "height": 720}
-            w, h = vs["width"], vs["height"]
+            w, h = VIEWPORT["width"], VIEWPORT["height"]
+
+            # Resolve event parameters once, outside apply(), so the
+            # math is not repeated for the visible-page mirror and the
+            # lock-held section spends its time only on Playwright calls.
+            if name == "click":
+                x, y = _click_coords(msg, w, h)
+            elif name == "wheel":
+                pixels = _wheel_pixels(msg, h)
+            elif name == "navigate":
+                url = _normalize_url(msg.get("url", "")) if msg.get("url") else ""
 
             async def apply(page):
                 if not page:
                     return
                 if name == "click":
-                    x = int(float(msg.get("x_ratio", 0)) * w)
-                    y = int(float(msg.get("y_ratio", 0)) * h)
                     await page.mouse.click(x, y)
                 elif name == "key":
                     key = msg.get("key")
@@ -202,41 +576,36 @@ async def handle_event(msg: dict):
                             await page.keyboard.type(key)
                         else:
                             await page.keyboard.press(key)
+                elif name == "text":
+                    text = msg.get("text")
+                    if text:
+                        await page.keyboard.type(text)
                 elif name == "navigate":
-                    url = msg.get("url", "")
                     if url:
-                        if not (url.startswith("http://") or url.startswith("https://")):
-                            url = "http://" + url
                         await page.goto(url)
                 elif name == "wheel":
-                    deltaY = float(msg.get("deltaY", 0))
-                    client_h = float(msg.get("clientHeight") or h)
-                    pixels = deltaY * (h / client_h) if client_h else deltaY
                     await page.evaluate("(dy) => window.scrollBy(0, dy)", pixels)
 
-            # Apply to both pages (if present)
+            # Apply to the headless page; mirror to the visible debug
+            # page best-effort without holding up the event path.
             await apply(HEADLESS_PAGE)
-            await apply(VISIBLE_PAGE)
+            if name == "navigate":
+                _refresh_meta()
+            if VISIBLE_PAGE:
+                async def _mirror_visible():
+                    try:
+                        await apply(VISIBLE_PAGE)
+                    except Exception:
+                        logger.debug("Visible-page mirror failed for event %s", name, exc_info=True)
+                asyncio.create_task(_mirror_visible())
 
             # Send fresh frame back to clients (if possible)
             if HEADLESS_PAGE:
                 try:
                     img_bytes = await HEADLESS_PAGE.screenshot(type="jpeg", quality=60)
-                    b64 = base64.b64encode(img_bytes).decode("ascii")
-                    payload = json.dumps({
-                        "type": "frame",
-                        "image": b64,
-                        "width": w,
-                        "height": h,
-                    })
-                    stale = []
-                    for ws in list(CLIENTS):
-                        try:
-                            await ws.send_text(payload)
-                        except Exception:
-                            stale.append(ws)
-                    for ws in stale:
-                        CLIENTS.discard(ws)
+                    payload = _frame_payload(img_bytes, w, h)
+                    LAST_FRAME["payload"] = payload
+                    await broadcast(payload)
                 except Exception:
                     logger.exception("Failed to capture/send frame after event.")
         except Exception:
@@ -244,4 +613,12 @@ async def handle_event(msg: dict):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=False)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=False,
+        loop="uvloop",
+        http="httptools",
+        ws="websockets",
+    )
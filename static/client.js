@@ -4,6 +4,12 @@
   const wsProto = (location.protocol === 'https:') ? 'wss://' : 'ws://';
   const wsUrl = wsProto + location.host + '/ws';
   const ws = new WebSocket(wsUrl);
+  ws.binaryType = 'arraybuffer'; // frames arrive as binary, control messages as JSON text
+
+  // Binary frame header (matches struct.pack("!BHH", ...) on the server):
+  // 1 byte frame type, 2 bytes width, 2 bytes height, then the image bytes.
+  const FRAME_HEADER_BYTES = 5;
+  const FRAME_MIME = { 1: 'image/jpeg', 2: 'image/webp' };
 
   // DOM elements (defensive)
   const statusEl = document.getElementById('status');
@@ -51,8 +57,48 @@
     console.error('WebSocket error', e);
   };
 
+  function renderFrame(buffer) {
+    const view = new DataView(buffer);
+    const frameType = view.getUint8(0);
+    const width = view.getUint16(1);
+    const height = view.getUint16(3);
+    if (width && height) remoteViewport = { width, height };
+
+    const blob = new Blob([buffer.slice(FRAME_HEADER_BYTES)], { type: FRAME_MIME[frameType] || 'image/jpeg' });
+
+    // If we have a canvas and a context, draw onto canvas.
+    if (isCanvas && ctx) {
+      createImageBitmap(blob).then((bmp) => {
+        // clear and draw the frame scaled to canvas size
+        try {
+          ctx.clearRect(0, 0, frameEl.width, frameEl.height);
+          ctx.drawImage(bmp, 0, 0, frameEl.width, frameEl.height);
+        } catch (err) {
+          console.error('Error drawing frame to canvas', err);
+        } finally {
+          bmp.close();
+        }
+      }).catch((err) => console.error('Error decoding frame', err));
+    } else if (frameEl && frameEl.tagName && frameEl.tagName.toLowerCase() === 'img') {
+      // set <img> src to an object URL, revoked once the image has loaded
+      const url = URL.createObjectURL(blob);
+      frameEl.onload = () => URL.revokeObjectURL(url);
+      frameEl.src = url;
+    } else {
+      console.warn('No valid element to render frame into.');
+    }
+  }
+
   ws.onmessage = (event) => {
-    // Event data expected to be JSON with type "meta" or "frame"
+    // Binary messages are frames; text messages are JSON control data (e.g. "meta").
+    if (event.data instanceof ArrayBuffer) {
+      try {
+        renderFrame(event.data);
+      } catch (err) {
+        console.error('Failed to handle binary frame', err);
+      }
+      return;
+    }
     try {
       const msg = JSON.parse(event.data);
       if (msg.type === 'meta') {
@@ -64,29 +110,6 @@
           frameEl.height = msg.viewport.height || frameEl.height;
           ctx = frameEl.getContext && frameEl.getContext('2d');
         }
-      } else if (msg.type === 'frame') {
-        if (!msg.image) return;
-        // If we have a canvas and a context, draw onto canvas.
-        if (isCanvas && ctx) {
-          const img = new Image();
-          img.onload = () => {
-            // clear and draw the frame scaled to canvas size
-            try {
-              ctx.clearRect(0, 0, frameEl.width, frameEl.height);
-              ctx.drawImage(img, 0, 0, frameEl.width, frameEl.height);
-            } catch (err) {
-              console.error('Error drawing image to canvas', err);
-            }
-          };
-          img.src = "data:image/jpeg;base64," + msg.image;
-        } else if (frameEl && frameEl.tagName && frameEl.tagName.toLowerCase() === 'img') {
-          // set <img> src directly
-          frameEl.src = "data:image/jpeg;base64," + msg.image;
-        } else {
-          console.warn('No valid element to render frame into.');
-        }
-
-        if (msg.width && msg.height) remoteViewport = { width: msg.width, height: msg.height };
       }
     } catch (err) {
       console.error('Failed to handle ws message', err, event.data);